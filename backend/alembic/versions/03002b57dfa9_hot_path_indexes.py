@@ -0,0 +1,32 @@
+"""hot path indexes
+
+Revision ID: 03002b57dfa9
+Revises: 859aa5247cf7
+Create Date: 2026-10-15 09:12:31.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '03002b57dfa9'
+down_revision: Union[str, Sequence[str], None] = '859aa5247cf7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_caller_daily_counters_date",
+        "caller_daily_counters",
+        ["date"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_caller_daily_counters_date", table_name="caller_daily_counters")
@@ -0,0 +1,35 @@
+"""lead_assignments latest-per-lead index
+
+Revision ID: 5c1e8f0a9d42
+Revises: 03002b57dfa9
+Create Date: 2026-10-15 11:40:07.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e8f0a9d42'
+down_revision: Union[str, Sequence[str], None] = '03002b57dfa9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_lead_assignments_lead_id_assigned_at",
+        "lead_assignments",
+        ["lead_id", sa.text("assigned_at DESC")],
+    )
+    # lead_id is the leading column of the index above.
+    op.drop_index("ix_lead_assignments_lead_id", table_name="lead_assignments")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index("ix_lead_assignments_lead_id", "lead_assignments", ["lead_id"])
+    op.drop_index("ix_lead_assignments_lead_id_assigned_at", table_name="lead_assignments")
@@ -0,0 +1,46 @@
+"""leads list ordering indexes
+
+Revision ID: c81f4a6d09e2
+Revises: a7d3b6e21f04
+Create Date: 2026-10-15 14:22:09.318547
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c81f4a6d09e2'
+down_revision: Union[str, Sequence[str], None] = 'a7d3b6e21f04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # list_leads orders by created_at DESC, id DESC; these let the planner walk
+    # the index and stop at LIMIT instead of sorting the filtered set. id
+    # breaks ties so the same indexes also serve keyset pagination.
+    op.create_index(
+        "ix_leads_state_created_at_id",
+        "leads",
+        ["state", sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+    op.create_index(
+        "ix_leads_created_at_id",
+        "leads",
+        [sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+    # Both are leading prefixes of the indexes above.
+    op.drop_index("ix_leads_state", table_name="leads")
+    op.drop_index("ix_leads_created_at", table_name="leads")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index("ix_leads_created_at", "leads", ["created_at"])
+    op.create_index("ix_leads_state", "leads", ["state"])
+    op.drop_index("ix_leads_created_at_id", table_name="leads")
+    op.drop_index("ix_leads_state_created_at_id", table_name="leads")
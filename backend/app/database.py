@@ -1,7 +1,8 @@
 import os
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import Select, create_engine, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 
 from dotenv import load_dotenv
 
@@ -16,10 +17,27 @@ DATABASE_URL = os.getenv(
 engine = create_engine(
     DATABASE_URL,
     future=True,
+    pool_size=int(os.getenv("DB_POOL_SIZE", "20")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+    pool_timeout=int(os.getenv("DB_POOL_TIMEOUT", "5")),
+    pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
     pool_pre_ping=True,
-    connect_args={"connect_timeout": 10},
+    # Compiled-SQL LRU shared by all sessions; sized so the hot statement
+    # shapes (list filters x paging, assignment queries) never get evicted.
+    query_cache_size=int(os.getenv("DB_QUERY_CACHE_SIZE", "1200")),
+    executemany_mode="values_plus_batch",
+    insertmanyvalues_page_size=1000,
+    executemany_batch_page_size=500,
+    connect_args={
+        "connect_timeout": 10,
+        "options": "-c statement_timeout=15000",
+    },
+)
+# Objects stay usable after commit: handlers build responses from what they
+# just wrote (server defaults arrive via RETURNING) instead of re-SELECTing.
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine, future=True
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
 
 Base = declarative_base()
 
@@ -31,3 +49,22 @@ def get_db():
     finally:
         db.close()
 
+
+
+def insert_on_conflict(db: Session, table):
+    """
+    Dialect-specific INSERT exposing ``on_conflict_do_nothing/do_update``.
+    Production runs on PostgreSQL; the test-suite runs on SQLite, which
+    supports the same upsert API.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(table)
+    return postgresql.insert(table)
+
+
+def count_query(stmt: Select) -> Select:
+    """
+    COUNT(*) over the same FROM/WHERE as `stmt`, without wrapping it in a
+    subquery. Apply before limit/offset.
+    """
+    return stmt.with_only_columns(func.count()).order_by(None)
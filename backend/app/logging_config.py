@@ -4,20 +4,28 @@ Emits JSON lines in production and coloured human-readable output in development
 """
 from __future__ import annotations
 
-import json
 import logging
 import os
+import re
 import sys
 import time
+from datetime import datetime, timezone
 from typing import Any
 
+import orjson
+
+# Attributes every LogRecord carries; anything else came in via `extra=`.
+_RESERVED = frozenset(
+    logging.LogRecord("", logging.INFO, "", 0, "", None, None).__dict__
+) | {"message", "asctime"}
+
 
 class _JsonFormatter(logging.Formatter):
     """Single-line JSON log records."""
 
     def format(self, record: logging.LogRecord) -> str:
         payload: dict[str, Any] = {
-            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="seconds"),
             "level": record.levelname,
             "logger": record.name,
             "msg": record.getMessage(),
@@ -25,10 +33,10 @@ class _JsonFormatter(logging.Formatter):
         if record.exc_info:
             payload["exc"] = self.formatException(record.exc_info)
         # Merge any extra fields passed via `extra=` kwarg
-        for key, val in record.__dict__.items():
-            if key not in logging.LogRecord.__dict__ and not key.startswith("_"):
-                payload[key] = val
-        return json.dumps(payload, default=str)
+        payload.update(
+            {k: v for k, v in record.__dict__.items() if k not in _RESERVED and not k.startswith("_")}
+        )
+        return orjson.dumps(payload, default=str).decode()
 
 
 class _DevFormatter(logging.Formatter):
@@ -41,9 +49,15 @@ class _DevFormatter(logging.Formatter):
     }
     _RESET = "\033[0m"
 
+    def __init__(self) -> None:
+        super().__init__()
+        # Coloured, padded level names built once rather than per record
+        self._prefix = {
+            lvl: f"{colour}{lvl:<8}{self._RESET}" for lvl, colour in self._COLOURS.items()
+        }
+
     def format(self, record: logging.LogRecord) -> str:
-        colour = self._COLOURS.get(record.levelname, "")
-        prefix = f"{colour}{record.levelname:<8}{self._RESET}"
+        prefix = self._prefix.get(record.levelname) or f"{record.levelname:<8}"
         base = f"{prefix} [{record.name}] {record.getMessage()}"
         if record.exc_info:
             base += "\n" + self.formatException(record.exc_info)
@@ -71,6 +85,12 @@ def configure_logging() -> None:
     for noisy in ("uvicorn.access", "sqlalchemy.engine"):
         logging.getLogger(noisy).setLevel(logging.WARNING)
 
+    if level <= logging.DEBUG:
+        from .database import DATABASE_URL
+
+        # Mask credentials; only worth computing when someone is debugging.
+        logger.debug("database url: %s", re.sub(r"://[^@]+@", "://***@", DATABASE_URL))
+
 
 # Module-level loggers used across the app
 logger = logging.getLogger("bloc")
@@ -1,13 +1,13 @@
 import os
 import time
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 
-from fastapi import Depends, FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.middleware.gzip import GZipMiddleware
 
-from .database import get_db
 from .logging_config import configure_logging
 from .routers import callers, leads, webhook
 from .services.realtime import connection_manager, AssignmentEventOut
@@ -18,6 +18,15 @@ logger = logging.getLogger("bloc.http")
 API_PREFIX = "/api"
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await connection_manager.start()
+    try:
+        yield
+    finally:
+        await connection_manager.stop()
+
+
 def create_app() -> FastAPI:
     app = FastAPI(
         title="Bloc Sales CRM",
@@ -29,6 +38,7 @@ def create_app() -> FastAPI:
         ),
         contact={"name": "Bloc Engineering"},
         license_info={"name": "MIT"},
+        lifespan=lifespan,
     )
 
     origins = os.getenv("CORS_ORIGINS", "https://bloc-tan.vercel.app").split(",")
@@ -38,20 +48,22 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Total-Count", "X-Next-Cursor"],
     )
+    app.add_middleware(GZipMiddleware, minimum_size=500)
 
     @app.middleware("http")
     async def log_requests(request: Request, call_next):
-        start = time.perf_counter()
+        start = time.monotonic_ns()
         response = await call_next(request)
-        elapsed_ms = (time.perf_counter() - start) * 1000
-        logger.info(
-            "%s %s → %s  (%.1fms)",
-            request.method,
-            request.url.path,
-            response.status_code,
-            elapsed_ms,
-        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "%s %s → %s  (%dms)",
+                request.method,
+                request.url.path,
+                response.status_code,
+                (time.monotonic_ns() - start) // 1_000_000,
+            )
         return response
 
     app.include_router(callers.router, prefix=API_PREFIX)
@@ -59,7 +71,7 @@ def create_app() -> FastAPI:
     app.include_router(webhook.router, prefix=API_PREFIX)
 
     @app.websocket("/ws/dashboard")
-    async def dashboard_ws(websocket: WebSocket, db: Session = Depends(get_db)):
+    async def dashboard_ws(websocket: WebSocket):
         await connection_manager.connect(websocket)
         try:
             while True:
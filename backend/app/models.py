@@ -12,6 +12,7 @@ from sqlalchemy import (
     Text,
     UniqueConstraint,
     Date,
+    func,
 )
 from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.orm import relationship, Mapped, mapped_column
@@ -40,12 +41,12 @@ class Caller(Base):
         default=CallerStatus.ACTIVE,
     )
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), default=datetime.utcnow, nullable=False
+        DateTime(timezone=True), server_default=func.now(), nullable=False
     )
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
-        default=datetime.utcnow,
-        onupdate=datetime.utcnow,
+        server_default=func.now(),
+        onupdate=func.now(),
         nullable=False,
     )
 
@@ -84,7 +85,7 @@ class Lead(Base):
     state: Mapped[str | None] = mapped_column(String, nullable=True)
     lead_metadata: Mapped[dict | None] = mapped_column("metadata", JSONB, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), default=datetime.utcnow, nullable=False
+        DateTime(timezone=True), server_default=func.now(), nullable=False
     )
     unassigned: Mapped[bool] = mapped_column(default=False, nullable=False)
 
@@ -115,7 +116,7 @@ class LeadAssignment(Base):
         ForeignKey("callers.id"), nullable=True
     )
     assigned_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), default=datetime.utcnow, nullable=False
+        DateTime(timezone=True), server_default=func.now(), nullable=False
     )
     assignment_reason: Mapped[str] = mapped_column(Text, nullable=False)
     status: Mapped[LeadAssignmentStatus] = mapped_column(
@@ -127,6 +128,9 @@ class LeadAssignment(Base):
     lead: Mapped["Lead"] = relationship("Lead", back_populates="assignments")
     caller: Mapped["Caller"] = relationship("Caller", back_populates="assignments")
 
+    # Fetch assigned_at in the INSERT's RETURNING instead of a later SELECT.
+    __mapper_args__ = {"eager_defaults": True}
+
 
 class RoundRobinPointer(Base):
     __tablename__ = "rr_pointers"
@@ -136,7 +140,7 @@ class RoundRobinPointer(Base):
         ForeignKey("callers.id"), nullable=True
     )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
 
 
@@ -149,3 +153,10 @@ class CallerDailyCounter(Base):
     date: Mapped[date] = mapped_column(Date, primary_key=True)
     count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
 
+
+# Native Postgres ENUM columns, for code that has to substitute their type
+# (the SQLite test harness). Add new Enum columns here.
+ENUM_COLUMNS: list[Column] = [
+    Caller.__table__.c.status,
+    LeadAssignment.__table__.c.status,
+]
@@ -2,13 +2,14 @@ from datetime import date
 from uuid import UUID, uuid4
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import func, select
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, delete, func, insert, select
+from sqlalchemy.orm import Session, joinedload, selectinload
 
 from app.database import get_db
 from app.models import Caller, CallerDailyCounter, CallerState, CallerStatus
 from app.schemas import CallerCreate, CallerOut, CallerStatusUpdate, CallerUpdate
-from app.services.assignment_engine import get_business_date
+from app.services.assignment_engine import get_business_date, invalidate_state_cache
+from app.services.caller_names import invalidate_caller_names
 
 
 router = APIRouter(prefix="/callers", tags=["callers"])
@@ -26,8 +27,9 @@ def create_caller(payload: CallerCreate, db: Session = Depends(get_db)):
     if payload.daily_limit < 0:
         raise HTTPException(status_code=400, detail="daily_limit must be non-negative")
 
+    caller_id = uuid4()
     caller = Caller(
-        id=uuid4(),
+        id=caller_id,
         name=payload.name,
         role=payload.role,
         languages=payload.languages,
@@ -37,13 +39,37 @@ def create_caller(payload: CallerCreate, db: Session = Depends(get_db)):
     db.add(caller)
     db.flush()
 
-    for state_value in payload.assigned_states:
-        db.add(CallerState(caller_id=caller.id, state=state_value))
+    if payload.assigned_states:
+        db.execute(
+            insert(CallerState),
+            [{"caller_id": caller_id, "state": state_value} for state_value in payload.assigned_states],
+        )
 
     db.commit()
-    db.refresh(caller)
-
-    leads_today = _leads_assigned_today(db, caller.id, get_business_date())
+    if payload.assigned_states:
+        invalidate_state_cache()
+    return _caller_response(db, caller_id, get_business_date())
+
+
+def _caller_response(db: Session, caller_id: UUID, today: date) -> CallerOut:
+    """Re-read a caller, its states and today's count in one round-trip after commit."""
+    caller, leads_today = (
+        db.execute(
+            select(Caller, func.coalesce(CallerDailyCounter.count, 0))
+            .outerjoin(
+                CallerDailyCounter,
+                and_(
+                    CallerDailyCounter.caller_id == Caller.id,
+                    CallerDailyCounter.date == today,
+                ),
+            )
+            .options(joinedload(Caller.states))
+            .where(Caller.id == caller_id)
+            .execution_options(populate_existing=True)
+        )
+        .unique()
+        .one()
+    )
     return CallerOut(
         id=caller.id,
         name=caller.name,
@@ -56,41 +82,36 @@ def create_caller(payload: CallerCreate, db: Session = Depends(get_db)):
     )
 
 
-def _leads_assigned_today(db: Session, caller_id: UUID, day: date) -> int:
-    counter = db.get(CallerDailyCounter, {"caller_id": caller_id, "date": day})
-    return counter.count if counter else 0
-
-
 @router.get("", response_model=list[CallerOut])
 def list_callers(db: Session = Depends(get_db)):
     today = get_business_date()
 
-    callers = db.scalars(select(Caller)).all()
-    state_rows = db.execute(
-        select(CallerState.caller_id, CallerState.state).where(
-            CallerState.caller_id.in_([c.id for c in callers])
+    # Today's counter rides along on the caller row; states come from one
+    # selectin batch (array_agg would tie this to Postgres, tests use SQLite).
+    rows = db.execute(
+        select(Caller, func.coalesce(CallerDailyCounter.count, 0))
+        .outerjoin(
+            CallerDailyCounter,
+            and_(
+                CallerDailyCounter.caller_id == Caller.id,
+                CallerDailyCounter.date == today,
+            ),
         )
+        .options(selectinload(Caller.states))
     ).all()
-    states_map: dict[UUID, list[str]] = {}
-    for cid, state_value in state_rows:
-        states_map.setdefault(cid, []).append(state_value)
-
-    counters = db.execute(
-        select(CallerDailyCounter).where(CallerDailyCounter.date == today)
-    ).scalars()
-    count_map = {c.caller_id: c.count for c in counters}
 
+    # Values are already typed by the ORM; skip per-field validation.
     results: list[CallerOut] = []
-    for c in callers:
+    for c, leads_today in rows:
         results.append(
-            CallerOut(
+            CallerOut.model_construct(
                 id=c.id,
                 name=c.name,
                 role=c.role,
                 languages=c.languages,
                 daily_limit=c.daily_limit,
-                assigned_states=states_map.get(c.id, []),
-                leads_assigned_today=count_map.get(c.id, 0),
+                assigned_states=[cs.state for cs in c.states],
+                leads_assigned_today=leads_today,
                 status=c.status,
             )
         )
@@ -117,25 +138,31 @@ def update_caller(
     if payload.status is not None:
         caller.status = payload.status
 
+    states_changed = False
     if payload.assigned_states is not None:
-        db.query(CallerState).filter(CallerState.caller_id == caller.id).delete()
-        for state_value in payload.assigned_states:
-            db.add(CallerState(caller_id=caller.id, state=state_value))
+        current = {cs.state for cs in caller.states}
+        new = set(payload.assigned_states)
+        to_add = new - current
+        to_remove = current - new
+        states_changed = bool(to_add or to_remove)
+        if to_remove:
+            db.execute(
+                delete(CallerState).where(
+                    CallerState.caller_id == caller.id,
+                    CallerState.state.in_(to_remove),
+                )
+            )
+        if to_add:
+            db.execute(
+                insert(CallerState),
+                [{"caller_id": caller.id, "state": state_value} for state_value in to_add],
+            )
 
     db.commit()
-    db.refresh(caller)
-
-    today = get_business_date()
-    return CallerOut(
-        id=caller.id,
-        name=caller.name,
-        role=caller.role,
-        languages=caller.languages,
-        daily_limit=caller.daily_limit,
-        assigned_states=[cs.state for cs in caller.states],
-        leads_assigned_today=_leads_assigned_today(db, caller.id, today),
-        status=caller.status,
-    )
+    invalidate_caller_names()
+    if states_changed or payload.status is not None:
+        invalidate_state_cache()
+    return _caller_response(db, caller_id, get_business_date())
 
 
 @router.patch("/{caller_id}/status", response_model=CallerOut)
@@ -147,19 +174,8 @@ def update_caller_status(
     caller = _get_caller_or_404(db, caller_id)
     caller.status = payload.status
     db.commit()
-    db.refresh(caller)
-
-    today = get_business_date()
-    return CallerOut(
-        id=caller.id,
-        name=caller.name,
-        role=caller.role,
-        languages=caller.languages,
-        daily_limit=caller.daily_limit,
-        assigned_states=[cs.state for cs in caller.states],
-        leads_assigned_today=_leads_assigned_today(db, caller.id, today),
-        status=caller.status,
-    )
+    invalidate_state_cache()
+    return _caller_response(db, caller_id, get_business_date())
 
 
 @router.delete("/{caller_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -167,5 +183,6 @@ def delete_caller(caller_id: UUID, db: Session = Depends(get_db)):
     caller = _get_caller_or_404(db, caller_id)
     caller.status = CallerStatus.PAUSED
     db.commit()
+    invalidate_state_cache()
     return
 
@@ -1,70 +1,80 @@
 from datetime import datetime
 from typing import Optional
+from urllib.parse import urlencode
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import and_, or_, select, func
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, or_, select, tuple_
+from sqlalchemy.orm import Session, aliased
 
-from app.database import get_db
-from app.models import Caller, Lead, LeadAssignment
+from app.database import count_query, get_db
+from app.models import Lead, LeadAssignment
 from app.schemas import LeadListItem, LeadOut, LeadReassignRequest
 from app.services.assignment_engine import assign_lead
+from app.services.caller_names import caller_names
 from app.services.realtime import AssignmentEventOut, connection_manager
 
 
 router = APIRouter(prefix="/leads", tags=["leads"])
 
 
-def _latest_assignment_subquery():
-    """Return a subquery that has the single most-recent assignment per lead."""
-    la = LeadAssignment.__table__
-
-    # Rank assignments by assigned_at descending within each lead_id partition
-    ranked = (
-        select(
-            la,
-            func.row_number()
-            .over(partition_by=la.c.lead_id, order_by=la.c.assigned_at.desc())
-            .label("rn"),
-        )
-    ).subquery("la_ranked")
-
+def _latest_assignment_id():
+    """
+    Correlated scalar subquery: id of the most recent assignment for the
+    enclosing Lead row. Postgres resolves it per returned lead with an index
+    seek on (lead_id, assigned_at DESC) instead of ranking the whole table.
+    """
+    la = aliased(LeadAssignment)
     return (
-        select(ranked)
-        .where(ranked.c.rn == 1)
-        .subquery("la_latest")
+        select(la.id)
+        .where(la.lead_id == Lead.id)
+        .order_by(la.assigned_at.desc())
+        .limit(1)
+        .scalar_subquery()
     )
 
 
 @router.get("", response_model=list[LeadListItem])
 def list_leads(
+    response: Response,
     state: Optional[str] = None,
     caller_id: Optional[UUID] = None,
     search: Optional[str] = None,
     limit: int = Query(50, le=200),
     offset: int = 0,
+    cursor_ts: Optional[datetime] = None,
+    cursor_id: Optional[UUID] = None,
+    include_total: bool = False,
     db: Session = Depends(get_db),
 ):
-    la_latest = _latest_assignment_subquery()
+    """
+    Paginate with `offset`, or — cheaper for deep pages — pass the
+    `X-Next-Cursor` values from the previous page as `cursor_ts`/`cursor_id`.
+    """
+    if (cursor_ts is None) != (cursor_id is None):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail="cursor_ts and cursor_id must be given together",
+        )
 
     q = (
         select(
             Lead,
-            la_latest.c.status.label("la_status"),
-            la_latest.c.assignment_reason.label("la_reason"),
-            la_latest.c.assigned_at.label("la_assigned_at"),
-            Caller,
+            LeadAssignment.status.label("la_status"),
+            LeadAssignment.assignment_reason.label("la_reason"),
+            LeadAssignment.assigned_at.label("la_assigned_at"),
+            LeadAssignment.caller_id.label("la_caller_id"),
         )
-        .join(la_latest, la_latest.c.lead_id == Lead.id, isouter=True)
-        .join(Caller, Caller.id == la_latest.c.caller_id, isouter=True)
+        .select_from(Lead)
+        .join(LeadAssignment, LeadAssignment.id == _latest_assignment_id(), isouter=True)
     )
 
     conditions = []
     if state:
         conditions.append(Lead.state == state)
     if caller_id:
-        conditions.append(la_latest.c.caller_id == caller_id)
+        conditions.append(LeadAssignment.caller_id == caller_id)
     if search:
         pattern = f"%{search}%"
         conditions.append(or_(Lead.phone.ilike(pattern), Lead.name.ilike(pattern)))
@@ -72,19 +82,36 @@ def list_leads(
     if conditions:
         q = q.where(and_(*conditions))
 
-    q = q.order_by(Lead.created_at.desc()).limit(limit).offset(offset)
+    if include_total:
+        response.headers["X-Total-Count"] = str(db.scalar(count_query(q)))
+
+    if cursor_ts is not None and cursor_id is not None:
+        # Keyset: resume strictly after the last row of the previous page.
+        q = q.where(tuple_(Lead.created_at, Lead.id) < tuple_(cursor_ts, cursor_id))
+    elif offset:
+        q = q.offset(offset)
+
+    q = q.order_by(Lead.created_at.desc(), Lead.id.desc()).limit(limit)
 
     rows = db.execute(q).all()
+    if rows and len(rows) == limit:
+        last = rows[-1][0]
+        response.headers["X-Next-Cursor"] = urlencode(
+            {"cursor_ts": last.created_at.isoformat(), "cursor_id": str(last.id)}
+        )
+    # Names come from a process cache instead of a join against callers.
+    names = caller_names(db, (row.la_caller_id for row in rows))
+    # Values are already typed by the ORM; skip per-field validation.
     items: list[LeadListItem] = []
-    for lead, la_status, la_reason, la_assigned_at, caller in rows:
+    for lead, la_status, la_reason, la_assigned_at, la_caller_id in rows:
         items.append(
-            LeadListItem(
+            LeadListItem.model_construct(
                 id=lead.id,
                 name=lead.name,
                 phone=lead.phone,
                 state=lead.state,
                 lead_source=lead.lead_source,
-                assigned_caller_name=getattr(caller, "name", None),
+                assigned_caller_name=names.get(la_caller_id),
                 assignment_status=la_status,
                 assignment_reason=la_reason,
                 assigned_at=la_assigned_at,
@@ -95,20 +122,16 @@ def list_leads(
 
 @router.get("/{lead_id}", response_model=LeadOut)
 def get_lead(lead_id: UUID, db: Session = Depends(get_db)):
-    lead = (
-        db.query(Lead)
-        .options(joinedload(Lead.assignments).joinedload(LeadAssignment.caller))
-        .filter(Lead.id == lead_id)
-        .first()
-    )
+    lead = db.get(Lead, lead_id)
     if lead is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="lead not found")
 
-    latest = (
-        sorted(lead.assignments, key=lambda a: a.assigned_at, reverse=True)[0]
-        if lead.assignments
-        else None
-    )
+    latest = db.scalars(
+        select(LeadAssignment)
+        .where(LeadAssignment.lead_id == lead_id)
+        .order_by(LeadAssignment.assigned_at.desc())
+        .limit(1)
+    ).first()
     return LeadOut(
         id=lead.id,
         name=lead.name,
@@ -124,12 +147,10 @@ def get_lead(lead_id: UUID, db: Session = Depends(get_db)):
     )
 
 
-@router.patch("/{lead_id}/reassign", response_model=LeadOut)
-async def reassign_lead(
-    lead_id: UUID,
-    payload: LeadReassignRequest,
-    db: Session = Depends(get_db),
-):
+def _reassign(
+    db: Session, lead_id: UUID, payload: LeadReassignRequest
+) -> tuple[LeadOut, AssignmentEventOut]:
+    """Blocking DB work for a reassign; run off the event loop."""
     lead = db.get(Lead, lead_id)
     if lead is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="lead not found")
@@ -141,21 +162,15 @@ async def reassign_lead(
         reason_override="manual_reassign",
     )
     db.commit()
-    db.refresh(lead)
-    db.refresh(assignment)
 
-
-    await connection_manager.broadcast_assignment(
-        AssignmentEventOut(
-            lead_id=str(lead.id),
-            caller_id=str(assignment.caller_id) if assignment.caller_id else None,
-            assignment_status=assignment.status,
-            assignment_reason=assignment.assignment_reason,
-            timestamp=datetime.utcnow(),
-        )
+    event = AssignmentEventOut(
+        lead_id=str(lead.id),
+        caller_id=str(assignment.caller_id) if assignment.caller_id else None,
+        assignment_status=assignment.status,
+        assignment_reason=assignment.assignment_reason,
+        timestamp=datetime.utcnow(),
     )
-
-    return LeadOut(
+    lead_out = LeadOut(
         id=lead.id,
         name=lead.name,
         phone=lead.phone,
@@ -168,4 +183,17 @@ async def reassign_lead(
         assignment_status=assignment.status,
         assignment_reason=assignment.assignment_reason,
     )
+    return lead_out, event
 
+
+@router.patch("/{lead_id}/reassign", response_model=LeadOut)
+async def reassign_lead(
+    lead_id: UUID,
+    payload: LeadReassignRequest,
+    db: Session = Depends(get_db),
+):
+    # The session is synchronous; keep its round-trips off the event loop.
+    lead_out, event = await run_in_threadpool(_reassign, db, lead_id, payload)
+    # Queued for the realtime consumer; a slow socket can't delay the response.
+    connection_manager.broadcast_assignment(event)
+    return lead_out
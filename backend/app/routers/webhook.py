@@ -4,19 +4,29 @@ from datetime import datetime
 from uuid import uuid4
 
 from fastapi import APIRouter, Depends, Header, HTTPException, status
-from sqlalchemy.exc import IntegrityError
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.models import Lead
+from app.database import get_db, insert_on_conflict
+from app.models import Lead, LeadAssignment
 from app.schemas import LeadWebhookIn, LeadOut
 from app.services.assignment_engine import assign_lead
+from app.services.lead_ingest import ingest_leads, lead_row
 from app.services.realtime import AssignmentEventOut, connection_manager
 
 log = logging.getLogger("bloc.webhook")
 
 router = APIRouter(tags=["webhook"])
 
+# Batches larger than this broadcast a single event instead of one per lead.
+BATCH_BROADCAST_LIMIT = 100
+# Leads assigned per transaction in a batch. Each assignment locks its
+# round-robin pointer row until commit, so small chunks keep single-lead
+# webhooks from queueing behind a large import.
+BATCH_ASSIGN_CHUNK_SIZE = 100
+# Largest batch accepted in one request.
+BATCH_MAX_ROWS = int(os.getenv("WEBHOOK_BATCH_MAX_ROWS", "50000"))
+
 
 def _verify_webhook_secret(x_webhook_secret: str | None) -> None:
     expected = os.getenv("WEBHOOK_SECRET")
@@ -25,56 +35,7 @@ def _verify_webhook_secret(x_webhook_secret: str | None) -> None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="unauthorized")
 
 
-@router.post("/leads/webhook", response_model=LeadOut)
-async def lead_webhook(
-    payload: LeadWebhookIn,
-    x_webhook_secret: str | None = Header(default=None),
-    db: Session = Depends(get_db),
-):
-    _verify_webhook_secret(x_webhook_secret)
-
-    try:
-        lead = Lead(
-            id=uuid4(),
-            name=payload.name,
-            phone=payload.phone,
-            timestamp_from_sheet=payload.timestamp,
-            lead_source=payload.lead_source,
-            city=payload.city,
-            state=payload.state,
-            lead_metadata=payload.metadata,
-        )
-        db.add(lead)
-        db.flush()
-    except IntegrityError:
-        db.rollback()
-        lead = (
-            db.query(Lead)
-            .filter(
-                Lead.phone == payload.phone,
-                Lead.timestamp_from_sheet == payload.timestamp,
-            )
-            .first()
-        )
-        if lead is None:
-            raise
-
-    assignment = assign_lead(db, lead)
-    db.commit()
-    db.refresh(lead)
-    db.refresh(assignment)
-
-    await connection_manager.broadcast_assignment(
-        AssignmentEventOut(
-            lead_id=str(lead.id),
-            caller_id=str(assignment.caller_id) if assignment.caller_id else None,
-            assignment_status=assignment.status,
-            assignment_reason=assignment.assignment_reason,
-            timestamp=datetime.utcnow(),
-        )
-    )
-
-    assigned_caller_id = assignment.caller_id
+def _lead_out(lead: Lead, assignment: LeadAssignment) -> LeadOut:
     return LeadOut(
         id=lead.id,
         name=lead.name,
@@ -84,8 +45,100 @@ async def lead_webhook(
         state=lead.state,
         metadata=lead.lead_metadata,
         created_at=lead.created_at,
-        assigned_caller_id=assigned_caller_id,
+        assigned_caller_id=assignment.caller_id,
+        assignment_status=assignment.status,
+        assignment_reason=assignment.assignment_reason,
+    )
+
+
+def _assignment_event(lead: Lead, assignment: LeadAssignment) -> AssignmentEventOut:
+    return AssignmentEventOut(
+        lead_id=str(lead.id),
+        caller_id=str(assignment.caller_id) if assignment.caller_id else None,
         assignment_status=assignment.status,
         assignment_reason=assignment.assignment_reason,
+        timestamp=datetime.utcnow(),
+    )
+
+
+def _ingest_lead(db: Session, payload: LeadWebhookIn) -> tuple[LeadOut, AssignmentEventOut]:
+    """Blocking DB work for one webhook call; run off the event loop."""
+    # A replayed webhook hits the (phone, timestamp_from_sheet) constraint; the
+    # no-op update makes RETURNING hand back the existing row in the same trip.
+    stmt = insert_on_conflict(db, Lead).values(
+        id=uuid4(),
+        name=payload.name,
+        phone=payload.phone,
+        timestamp_from_sheet=payload.timestamp,
+        lead_source=payload.lead_source,
+        city=payload.city,
+        state=payload.state,
+        lead_metadata=payload.metadata,
     )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["phone", "timestamp_from_sheet"],
+        set_={"phone": stmt.excluded.phone},
+    ).returning(Lead)
+    lead = db.scalars(stmt, execution_options={"populate_existing": True}).one()
+
+    assignment = assign_lead(db, lead)
+    db.commit()
+    return _lead_out(lead, assignment), _assignment_event(lead, assignment)
+
+
+def _ingest_batch(
+    db: Session, payload: list[LeadWebhookIn]
+) -> list[tuple[LeadOut, AssignmentEventOut]]:
+    leads = sorted(
+        ingest_leads(db, [lead_row(p) for p in payload]),
+        key=lambda lead: lead.timestamp_from_sheet,
+    )
+    # Commit the inserts before taking any pointer locks.
+    db.commit()
+
+    assigned: list[tuple[Lead, LeadAssignment]] = []
+    for start in range(0, len(leads), BATCH_ASSIGN_CHUNK_SIZE):
+        chunk = leads[start:start + BATCH_ASSIGN_CHUNK_SIZE]
+        assigned.extend((lead, assign_lead(db, lead)) for lead in chunk)
+        db.commit()
+    return [(_lead_out(lead, a), _assignment_event(lead, a)) for lead, a in assigned]
+
+
+@router.post("/leads/webhook", response_model=LeadOut)
+async def lead_webhook(
+    payload: LeadWebhookIn,
+    x_webhook_secret: str | None = Header(default=None),
+    db: Session = Depends(get_db),
+):
+    _verify_webhook_secret(x_webhook_secret)
+
+    # The session is synchronous; keep its round-trips off the event loop.
+    lead_out, event = await run_in_threadpool(_ingest_lead, db, payload)
+    # Queued for the realtime consumer; a slow socket can't delay the response.
+    connection_manager.broadcast_assignment(event)
+    return lead_out
+
+
+@router.post("/leads/webhook/batch", response_model=list[LeadOut])
+async def lead_webhook_batch(
+    payload: list[LeadWebhookIn],
+    x_webhook_secret: str | None = Header(default=None),
+    db: Session = Depends(get_db),
+):
+    """Bulk variant of the webhook; duplicates are skipped and omitted from the response."""
+    _verify_webhook_secret(x_webhook_secret)
+    if len(payload) > BATCH_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail=f"batch exceeds {BATCH_MAX_ROWS} rows",
+        )
 
+    ingested = await run_in_threadpool(_ingest_batch, db, payload)
+    events = [event for _, event in ingested]
+    if len(events) > BATCH_BROADCAST_LIMIT:
+        # The dashboard reloads its lead list on an event for a lead it hasn't
+        # seen, so one event covers a large batch without flooding the queue.
+        events = events[-1:]
+    for event in events:
+        connection_manager.broadcast_assignment(event)
+    return [lead_out for lead_out, _ in ingested]
@@ -3,13 +3,14 @@ from __future__ import annotations
 import logging
 import time
 from datetime import date, datetime
-from typing import Iterable, Optional
+from typing import Optional
 from uuid import UUID
 
-from sqlalchemy import select, update, func
+from sqlalchemy import Select, and_, or_, select, update, func
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from app.database import insert_on_conflict
 from app.models import (
     Caller,
     CallerDailyCounter,
@@ -29,77 +30,151 @@ def get_business_date() -> date:
     return date.today()
 
 
-def _eligible_callers_for_state(db: Session, state: Optional[str]) -> list[Caller]:
-    base_query = select(Caller).where(Caller.status == "active")
-
+def _eligible_callers_query(state: Optional[str], business_date: date) -> Select:
+    """Active callers still under today's cap, restricted to `state` when given."""
+    q = (
+        select(Caller)
+        .outerjoin(
+            CallerDailyCounter,
+            and_(
+                CallerDailyCounter.caller_id == Caller.id,
+                CallerDailyCounter.date == business_date,
+            ),
+        )
+        .where(
+            Caller.status == "active",
+            or_(
+                Caller.daily_limit == 0,
+                func.coalesce(CallerDailyCounter.count, 0) < Caller.daily_limit,
+            ),
+        )
+    )
     if state:
-        state_q = (
-            base_query.join(CallerState, Caller.id == CallerState.caller_id)
-            .where(CallerState.state == state)
-            .with_for_update()
+        q = q.join(CallerState, Caller.id == CallerState.caller_id).where(
+            CallerState.state == state
         )
-        callers = list(db.scalars(state_q))
-        if callers:
-            return callers
+    return q
 
-    q = base_query.with_for_update()
-    return list(db.scalars(q))
 
+# state -> (expires_at, has_callers, has_active_callers). Caller-state mappings
+# and statuses change rarely, so a short TTL plus explicit invalidation from
+# the callers router is enough.
+_STATE_CACHE_TTL = 60.0
+_STATE_CACHE_MAX = 512
+_state_callers: dict[str, tuple[float, bool, bool]] = {}
 
-def _apply_daily_cap_filter(
-    db: Session, callers: Iterable[Caller], business_date: date
-) -> list[Caller]:
-    caller_ids = [c.id for c in callers]
-    if not caller_ids:
-        return []
 
-    counters = db.execute(
-        select(CallerDailyCounter)
-        .where(
-            CallerDailyCounter.caller_id.in_(caller_ids),
-            CallerDailyCounter.date == business_date,
-        )
-        .with_for_update()
-    ).scalars()
-    count_map = {c.caller_id: c for c in counters}
+def invalidate_state_cache() -> None:
+    """
+    Forget cached state lookups; call after any caller_states mutation or
+    caller status change.
+    """
+    _state_callers.clear()
 
-    eligible: list[Caller] = []
-    for c in callers:
-        if c.daily_limit == 0:
-            eligible.append(c)
-            continue
-        counter = count_map.get(c.id)
-        current = counter.count if counter else 0
-        if current < c.daily_limit:
-            eligible.append(c)
-    return eligible
+
+def _state_callers_cached(db: Session, state: str) -> tuple[bool, bool]:
+    """
+    Whether any caller covers `state`, and whether any of those is active
+    (regardless of today's caps). Both come from one query.
+    """
+    now = time.monotonic()
+    hit = _state_callers.get(state)
+    if hit is not None and hit[0] > now:
+        return hit[1], hit[2]
+
+    total, active = db.execute(
+        select(func.count(CallerState.caller_id), func.count(Caller.id))
+        .select_from(CallerState)
+        .outerjoin(Caller, and_(Caller.id == CallerState.caller_id, Caller.status == "active"))
+        .where(CallerState.state == state)
+    ).one()
+    if len(_state_callers) >= _STATE_CACHE_MAX:
+        _state_callers.clear()
+    _state_callers[state] = (now + _STATE_CACHE_TTL, total > 0, active > 0)
+    return total > 0, active > 0
+
+
+def _lock_round_robin_pointer(db: Session, key: str) -> RoundRobinPointer:
+    """Return the pointer row for `key`, locked for the rest of the transaction."""
+    q = (
+        select(RoundRobinPointer)
+        .where(RoundRobinPointer.key == key)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    pointer = db.scalars(q).first()
+    if pointer is None:
+        db.execute(
+            insert_on_conflict(db, RoundRobinPointer)
+            .values(key=key, last_caller_id=None)
+            .on_conflict_do_nothing(index_elements=["key"])
+        )
+        pointer = db.scalars(q).one()
+    return pointer
 
 
 def _next_round_robin_caller(
-    db: Session, key: str, eligible: list[Caller]
+    db: Session, eligible: Select, after: Optional[UUID], skip: set[UUID]
 ) -> Optional[Caller]:
-    if not eligible:
-        return None
-
-    pointer = db.get(RoundRobinPointer, key)
-    if pointer is None:
-        pointer = RoundRobinPointer(key=key, last_caller_id=None)
-        db.add(pointer)
-        db.flush()
-
-    ordered = sorted(eligible, key=lambda c: str(c.id))
-    if pointer.last_caller_id is None:
-        chosen = ordered[0]
-    else:
-        ids = [c.id for c in ordered]
-        try:
-            idx = ids.index(pointer.last_caller_id)
-            chosen = ordered[(idx + 1) % len(ordered)]
-        except ValueError:
-            chosen = ordered[0]
+    """First eligible caller by id after `after`, wrapping to the lowest id."""
+    q = eligible.order_by(Caller.id).limit(1)
+    if skip:
+        q = q.where(Caller.id.not_in(skip))
+    if after is not None:
+        chosen = db.scalars(q.where(Caller.id > after)).first()
+        if chosen is not None:
+            return chosen
+    return db.scalars(q).first()
+
+
+def _claim_next_caller(
+    db: Session, eligible: Select, pointer: RoundRobinPointer, day: date
+) -> Optional[tuple[Caller, int]]:
+    """
+    Walk the rotation until a caller's daily slot is claimed. Returns the
+    caller and their new count for `day`, or None if every caller is full.
+    """
+    after = pointer.last_caller_id
+    tried: set[UUID] = set()
+    while (caller := _next_round_robin_caller(db, eligible, after, tried)) is not None:
+        count = _claim_daily_slot(db, caller, day)
+        if count is not None:
+            return caller, count
+        tried.add(caller.id)
+        after = caller.id
+    return None
+
+
+def _claim_daily_slot(db: Session, caller: Caller, day: date) -> Optional[int]:
+    """
+    Increment the caller's counter only if it is still under the daily cap and
+    return the new count. Returns None when a concurrent assignment took the
+    last slot.
+    """
+    if caller.daily_limit == 0:
+        return increment_daily_counter(db, caller.id, day)
 
-    pointer.last_caller_id = chosen.id
-    return chosen
+    stmt = insert_on_conflict(db, CallerDailyCounter).values(
+        caller_id=caller.id, date=day, count=1
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["caller_id", "date"],
+        set_={"count": CallerDailyCounter.count + 1},
+        where=CallerDailyCounter.count < caller.daily_limit,
+    ).returning(CallerDailyCounter.count)
+    return db.execute(stmt).scalar()
+
+
+def increment_daily_counter(db: Session, caller_id: UUID, day: date) -> int:
+    """Atomically bump (or create) the caller's counter for `day`; returns the new count."""
+    stmt = insert_on_conflict(db, CallerDailyCounter).values(
+        caller_id=caller_id, date=day, count=1
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["caller_id", "date"],
+        set_={"count": CallerDailyCounter.count + 1},
+    ).returning(CallerDailyCounter.count)
+    return db.execute(stmt).scalar_one()
 
 
 def assign_lead(
@@ -122,14 +197,23 @@ def assign_lead(
         chosen = caller
         assignment_reason = reason_override or "manual_reassign"
         log.info("assign_lead manual | caller=%s (%s)", caller.id, caller.name)
+        count_today = increment_daily_counter(db, chosen.id, business_date)
     else:
-        eligible = _eligible_callers_for_state(db, lead.state)
-        log.info("assign_lead state_eligible | count=%d state=%s", len(eligible), lead.state)
-
-        eligible = _apply_daily_cap_filter(db, eligible, business_date)
-        log.info("assign_lead cap_filtered | count=%d date=%s", len(eligible), business_date)
-
-        if not eligible:
+        has_state_specific, has_active_state = (
+            _state_callers_cached(db, lead.state) if lead.state else (False, False)
+        )
+        key = f"state:{lead.state}" if has_state_specific else "global"
+
+        # Only the pointer row is locked, so concurrent leads for other keys
+        # never wait on each other; caps are enforced by the claim itself.
+        pointer = _lock_round_robin_pointer(db, key)
+        # Active state callers own the lead even when all are capped; only a
+        # state with none active falls back to the global pool.
+        eligible = _eligible_callers_query(
+            lead.state if has_active_state else None, business_date
+        )
+        claimed = _claim_next_caller(db, eligible, pointer, business_date)
+        if claimed is None:
             log.warning("assign_lead unassigned | reason=cap_reached lead_id=%s", lead.id)
             lead.unassigned = True
             assignment = LeadAssignment(
@@ -140,29 +224,8 @@ def assign_lead(
             )
             db.add(assignment)
             return assignment
-
-        has_state_specific = bool(
-            lead.state
-            and db.scalar(
-                select(func.count())
-                .select_from(CallerState)
-                .where(CallerState.state == lead.state)
-            )
-        )
-        key = f"state:{lead.state}" if lead.state and has_state_specific else "global"
-
-        chosen = _next_round_robin_caller(db, key, eligible)
-        if chosen is None:
-            log.warning("assign_lead unassigned | reason=no_eligible lead_id=%s", lead.id)
-            lead.unassigned = True
-            assignment = LeadAssignment(
-                lead_id=lead.id,
-                caller_id=None,
-                status=LeadAssignmentStatus.UNASSIGNED,
-                assignment_reason="unassigned_no_eligible",
-            )
-            db.add(assignment)
-            return assignment
+        chosen, count_today = claimed
+        pointer.last_caller_id = chosen.id
 
         assignment_reason = reason_override or (
             "state_round_robin" if key.startswith("state:") else "global_round_robin"
@@ -172,20 +235,6 @@ def assign_lead(
             chosen.id, chosen.name, key, assignment_reason,
         )
 
-    counter = db.get(
-        CallerDailyCounter,
-        {"caller_id": chosen.id, "date": business_date},
-    )
-    if counter is None:
-        counter = CallerDailyCounter(
-            caller_id=chosen.id,
-            date=business_date,
-            count=0,
-        )
-        db.add(counter)
-        db.flush()
-    counter.count += 1
-
     assignment = LeadAssignment(
         lead_id=lead.id,
         caller_id=chosen.id,
@@ -196,8 +245,8 @@ def assign_lead(
 
     elapsed_ms = (time.perf_counter() - t0) * 1000
     log.info(
-        "assign_lead complete | lead_id=%s caller=%s reason=%s  (%.1fms)",
-        lead.id, chosen.name, assignment_reason, elapsed_ms,
+        "assign_lead complete | lead_id=%s caller=%s reason=%s today=%d  (%.1fms)",
+        lead.id, chosen.name, assignment_reason, count_today, elapsed_ms,
     )
     return assignment
 
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from typing import Iterable, Optional
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models import Caller
+
+# caller_id -> name. Filled on miss; cleared by the callers router on updates.
+_caller_names: dict[UUID, str] = {}
+
+
+def invalidate_caller_names() -> None:
+    _caller_names.clear()
+
+
+def caller_names(db: Session, caller_ids: Iterable[Optional[UUID]]) -> dict[UUID, str]:
+    """Names for the given callers, loading any not yet cached in one query."""
+    missing = {cid for cid in caller_ids if cid is not None and cid not in _caller_names}
+    if missing:
+        _caller_names.update(
+            db.execute(select(Caller.id, Caller.name).where(Caller.id.in_(missing))).all()
+        )
+    return _caller_names
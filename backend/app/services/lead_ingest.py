@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import io
+import logging
+import os
+from uuid import uuid4
+
+import orjson
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from app.database import insert_on_conflict
+from app.models import Lead
+from app.schemas import LeadWebhookIn
+
+log = logging.getLogger("bloc.webhook")
+
+# Rows per multi-VALUES INSERT statement.
+BULK_INSERT_CHUNK_SIZE = 500
+# Above this many rows, stream through COPY instead (Postgres only).
+COPY_THRESHOLD = int(os.getenv("LEAD_COPY_THRESHOLD", "10000"))
+
+# (leads column, lead_row key) in COPY order.
+_COPY_FIELDS = (
+    ("id", "id"),
+    ("name", "name"),
+    ("phone", "phone"),
+    ("timestamp_from_sheet", "timestamp_from_sheet"),
+    ("lead_source", "lead_source"),
+    ("city", "city"),
+    ("state", "state"),
+    ("metadata", "lead_metadata"),
+)
+
+
+def lead_row(payload: LeadWebhookIn) -> dict:
+    """Map a webhook payload onto `Lead` attribute names."""
+    return {
+        "id": uuid4(),
+        "name": payload.name,
+        "phone": payload.phone,
+        "timestamp_from_sheet": payload.timestamp,
+        "lead_source": payload.lead_source,
+        "city": payload.city,
+        "state": payload.state,
+        "lead_metadata": payload.metadata,
+    }
+
+
+def bulk_upsert_leads(db: Session, rows: list[dict]) -> list[Lead]:
+    """
+    Insert leads with one multi-row INSERT per chunk, skipping rows that
+    collide on (phone, timestamp_from_sheet). Returns the new rows.
+    """
+    inserted: list[Lead] = []
+    for start in range(0, len(rows), BULK_INSERT_CHUNK_SIZE):
+        chunk = rows[start:start + BULK_INSERT_CHUNK_SIZE]
+        stmt = (
+            insert_on_conflict(db, Lead)
+            .values(chunk)
+            .on_conflict_do_nothing(index_elements=["phone", "timestamp_from_sheet"])
+            .returning(Lead)
+        )
+        inserted.extend(db.scalars(stmt))
+    log.info("bulk_upsert_leads | received=%d inserted=%d", len(rows), len(inserted))
+    return inserted
+
+
+def _copy_field(value) -> str:
+    """
+    One CSV field for COPY. Values are always quoted, so only the bare empty
+    field (CSV's default NULL) loads as NULL — a literal "\\N" or "" stays text.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, dict):
+        value = orjson.dumps(value).decode()
+    elif hasattr(value, "isoformat"):
+        value = value.isoformat()
+    else:
+        value = str(value)
+    return '"' + value.replace('"', '""') + '"'
+
+
+def bulk_ingest_leads_copy(db: Session, rows: list[dict]) -> list[Lead]:
+    """
+    COPY rows into a temp staging table, then merge into `leads` with
+    ON CONFLICT DO NOTHING. Requires psycopg2; returns the new rows.
+    """
+    buf = io.StringIO()
+    for row in rows:
+        buf.write(",".join(_copy_field(row[key]) for _, key in _COPY_FIELDS))
+        buf.write("\n")
+    buf.seek(0)
+
+    cols = ", ".join(col for col, _ in _COPY_FIELDS)
+    db.execute(text(
+        "CREATE TEMP TABLE _stage_leads (LIKE leads INCLUDING DEFAULTS) ON COMMIT DROP"
+    ))
+    cur = db.connection().connection.cursor()
+    try:
+        cur.copy_expert(f"COPY _stage_leads ({cols}) FROM STDIN WITH (FORMAT csv)", buf)
+    finally:
+        cur.close()
+    # Map RETURNING straight onto Lead so callers get rows without re-selecting
+    # thousands of ids.
+    merge = text(
+        f"INSERT INTO leads ({cols}) SELECT {cols} FROM _stage_leads "
+        "ON CONFLICT (phone, timestamp_from_sheet) DO NOTHING "
+        f"RETURNING {', '.join(c.name for c in Lead.__table__.c)}"
+    ).columns(*Lead.__table__.c)
+    inserted = list(db.scalars(select(Lead).from_statement(merge)))
+    db.execute(text("DROP TABLE _stage_leads"))
+    log.info("bulk_ingest_leads_copy | received=%d inserted=%d", len(rows), len(inserted))
+    return inserted
+
+
+def ingest_leads(db: Session, rows: list[dict]) -> list[Lead]:
+    """Pick multi-row INSERT or COPY depending on batch size and backend."""
+    if len(rows) > COPY_THRESHOLD and db.get_bind().dialect.name == "postgresql":
+        return bulk_ingest_leads_copy(db, rows)
+    return bulk_upsert_leads(db, rows)
@@ -1,16 +1,24 @@
 from __future__ import annotations
 
-from dataclasses import asdict, dataclass
+import asyncio
+import contextlib
+import logging
 from datetime import datetime
-from typing import List
 
+import orjson
 from fastapi import WebSocket
+from pydantic import BaseModel
 
 from app.models import LeadAssignmentStatus
 
+log = logging.getLogger("bloc.realtime")
 
-@dataclass
-class AssignmentEventOut:
+# Events waiting for fan-out; beyond this, new events are dropped rather than
+# blocking request handlers.
+BROADCAST_QUEUE_SIZE = 10_000
+
+
+class AssignmentEventOut(BaseModel):
     lead_id: str
     caller_id: str | None
     assignment_status: LeadAssignmentStatus
@@ -20,35 +28,61 @@ class AssignmentEventOut:
 
 class ConnectionManager:
     def __init__(self) -> None:
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: set[WebSocket] = set()
+        self._queue: asyncio.Queue[AssignmentEventOut] | None = None
+        self._consumer: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        """Start the fan-out consumer on the running loop (app startup)."""
+        self._queue = asyncio.Queue(maxsize=BROADCAST_QUEUE_SIZE)
+        self._consumer = asyncio.create_task(self._consume(self._queue))
+
+    async def stop(self) -> None:
+        if self._consumer is not None:
+            self._consumer.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._consumer
+        self._consumer = None
+        self._queue = None
 
     async def connect(self, websocket: WebSocket) -> None:
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
 
     def disconnect(self, websocket: WebSocket) -> None:
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        self.active_connections.discard(websocket)
 
-    async def broadcast_assignment(self, event: AssignmentEventOut) -> None:
-        if not self.active_connections:
+    def broadcast_assignment(self, event: AssignmentEventOut) -> None:
+        """Queue `event` for the dashboards; never waits on a subscriber."""
+        if self._queue is None or not self.active_connections:
             return
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            log.warning("Broadcast queue full — dropping event for lead %s", event.lead_id)
 
-        data = asdict(event)
-        # Pydantic / JSON can't handle enums and datetimes directly here,
-        # so normalise them.
-        data["assignment_status"] = event.assignment_status.value
-        data["timestamp"] = event.timestamp.isoformat()
-
-        disconnected: list[WebSocket] = []
-        for connection in self.active_connections:
+    async def _consume(self, queue: asyncio.Queue[AssignmentEventOut]) -> None:
+        while True:
+            event = await queue.get()
             try:
-                await connection.send_json({"type": "assignment", "payload": data})
+                await self._fan_out(event)
             except Exception:
-                disconnected.append(connection)
-        for ws in disconnected:
-            self.disconnect(ws)
+                # One bad event must not stop the consumer for good.
+                log.exception("Broadcast failed for lead %s", event.lead_id)
 
+    async def _fan_out(self, event: AssignmentEventOut) -> None:
+        # Encode once for every subscriber and send concurrently, so one slow
+        # socket costs max(rtt) rather than sum(rtt).
+        # orjson handles the enum and datetime natively.
+        message = orjson.dumps({"type": "assignment", "payload": event.model_dump()}).decode()
+        # Snapshot: sockets may connect/disconnect while the sends are in flight.
+        connections = tuple(self.active_connections)
+        results = await asyncio.gather(
+            *(ws.send_text(message) for ws in connections), return_exceptions=True
+        )
+        for ws, result in zip(connections, results):
+            if isinstance(result, Exception):
+                self.disconnect(ws)
 
-connection_manager = ConnectionManager()
 
+connection_manager = ConnectionManager()
@@ -4,7 +4,7 @@ import subprocess
 import sys
 import traceback
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine
 
 DATABASE_URL = os.getenv(
     "DATABASE_URL",
@@ -14,18 +14,22 @@ DATABASE_URL = os.getenv(
 try:
     print(f"Connecting to DB to clean orphaned objects...")
     engine = create_engine(DATABASE_URL, connect_args={"connect_timeout": 10})
-    with engine.connect() as conn:
+    # One round-trip, one transaction: a failure part-way leaves nothing dropped.
+    with engine.begin() as conn:
         # Drop ALL tables and types — full clean slate
-        conn.execute(text("DROP TABLE IF EXISTS lead_assignments CASCADE"))
-        conn.execute(text("DROP TABLE IF EXISTS caller_daily_counters CASCADE"))
-        conn.execute(text("DROP TABLE IF EXISTS caller_states CASCADE"))
-        conn.execute(text("DROP TABLE IF EXISTS rr_pointers CASCADE"))
-        conn.execute(text("DROP TABLE IF EXISTS leads CASCADE"))
-        conn.execute(text("DROP TABLE IF EXISTS callers CASCADE"))
-        conn.execute(text("DROP TABLE IF EXISTS alembic_version CASCADE"))
-        conn.execute(text("DROP TYPE IF EXISTS caller_status CASCADE"))
-        conn.execute(text("DROP TYPE IF EXISTS lead_assignment_status CASCADE"))
-        conn.commit()
+        conn.exec_driver_sql(
+            """
+            DROP TABLE IF EXISTS lead_assignments CASCADE;
+            DROP TABLE IF EXISTS caller_daily_counters CASCADE;
+            DROP TABLE IF EXISTS caller_states CASCADE;
+            DROP TABLE IF EXISTS rr_pointers CASCADE;
+            DROP TABLE IF EXISTS leads CASCADE;
+            DROP TABLE IF EXISTS callers CASCADE;
+            DROP TABLE IF EXISTS alembic_version CASCADE;
+            DROP TYPE IF EXISTS caller_status CASCADE;
+            DROP TYPE IF EXISTS lead_assignment_status CASCADE;
+            """
+        )
         print("✅ Dropped all tables, enums, and alembic_version")
 
     print("Running alembic upgrade head...")
@@ -1,18 +1,15 @@
 """
 conftest.py — SQLite-compatible test setup.
 
-The app uses PostgreSQL-specific column types (ARRAY, JSONB, native Uuid, Enum).
-This module patches those types before any app code is imported so the ORM
-mapper compiles with SQLite-friendly equivalents.  Once patched, all ORM
+The app uses PostgreSQL-specific column types (ARRAY, JSONB, native Enum).
+After importing the app, this module swaps those column types for
+SQLite-friendly TypeDecorators on the table metadata.  Once swapped, all ORM
 operations (INSERT, SELECT, flush, refresh, db.get) work transparently.
 """
-import json
-import sys
-import uuid as _uuid_mod
-
 # ─────────────────────────────────────────────────────────────────────────────
 # 1.  Build SQLite-compatible TypeDecorators
 # ─────────────────────────────────────────────────────────────────────────────
+import orjson
 from sqlalchemy import String, Text, types
 
 
@@ -43,6 +40,13 @@ class _TextEnum(types.TypeDecorator):
         return value
 
 
+# Pre-encoded values the helpers bind over and over (every make_caller
+# stores languages=["english"]).
+_EMPTY_ARRAY = "[]"
+_EMPTY_OBJECT = "{}"
+_ARRAY_CACHE = {("english",): '["english"]'}
+
+
 class _JsonArray(types.TypeDecorator):
     """Store a list as JSON string in SQLite TEXT."""
     impl = Text
@@ -52,12 +56,15 @@ class _JsonArray(types.TypeDecorator):
         super().__init__()
 
     def process_bind_param(self, value, dialect):
-        return json.dumps(value) if value is not None else "[]"
+        if not value:
+            return _EMPTY_ARRAY
+        cached = _ARRAY_CACHE.get(tuple(value))
+        return cached if cached is not None else orjson.dumps(value).decode()
 
     def process_result_value(self, value, dialect):
         if value is None:
             return []
-        return value if isinstance(value, list) else json.loads(value)
+        return value if isinstance(value, list) else orjson.loads(value)
 
 
 class _JsonObject(types.TypeDecorator):
@@ -66,182 +73,241 @@ class _JsonObject(types.TypeDecorator):
     cache_ok = True
 
     def process_bind_param(self, value, dialect):
-        return json.dumps(value) if value is not None else None
-
-    def process_result_value(self, value, dialect):
         if value is None:
             return None
-        return value if isinstance(value, dict) else json.loads(value)
-
-
-class _UuidStr(types.TypeDecorator):
-    """Store uuid.UUID as a 36-char dash-separated string in SQLite TEXT.
-
-    Replaces both ``sqlalchemy.dialects.postgresql.UUID`` and the built-in
-    ``sqlalchemy.types.Uuid`` so that every UUID column works on SQLite.
-    """
-    impl = String(36)
-    cache_ok = True
-
-    def __init__(self, *args, **kwargs):
-        super().__init__()
-
-    def process_bind_param(self, value, dialect):
-        if value is None:
-            return None
-        return str(value)  # always '550e8400-e29b-41d4-a716-...'
+        return orjson.dumps(value).decode() if value else _EMPTY_OBJECT
 
     def process_result_value(self, value, dialect):
         if value is None:
             return None
-        return value if isinstance(value, _uuid_mod.UUID) else _uuid_mod.UUID(str(value))
+        return value if isinstance(value, dict) else orjson.loads(value)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# 2.  Patch sqlalchemy internals BEFORE any app module is imported
+# 2.  Import the app unmodified
 # ─────────────────────────────────────────────────────────────────────────────
-
-# 2a. Replace the built-in Uuid type used by Mapped[uuid.UUID]
-import sqlalchemy.types as _sa_types
-import sqlalchemy as _sa
-
-_sa_types.Uuid = _UuidStr
-_sa.Uuid = _UuidStr
-
-# Also patch the internal registry that maps Python types → SA column types
-# so that ``Mapped[uuid.UUID]`` resolves to _UuidStr instead of Uuid()
-from sqlalchemy.orm import decl_api as _decl_api  # noqa
-_type_map = getattr(_decl_api, "_type_map", None) or getattr(_sa_types, "_type_map", {})
-if _uuid_mod.UUID in _type_map:
-    _type_map[_uuid_mod.UUID] = _UuidStr()
-
-# 2b. Replace postgresql-specific types
-from types import ModuleType as _ModuleType
-import sqlalchemy.dialects.postgresql as _real_pg
-
-_pg_shim = _ModuleType("sqlalchemy.dialects.postgresql")
-_pg_shim.__dict__.update(_real_pg.__dict__)
-_pg_shim.UUID = _UuidStr
-_pg_shim.ARRAY = _JsonArray
-_pg_shim.JSONB = _JsonObject
-sys.modules["sqlalchemy.dialects.postgresql"] = _pg_shim
-
-import sqlalchemy.dialects as _dialects
-_dialects.postgresql = _pg_shim
-
-# 2c. Patch the Enum constructor used in models.py so it stores by value
-import sqlalchemy as _sqla
-_OrigEnum = _sqla.Enum
-
-
-class _ValueEnum(_OrigEnum):
-    """SQLAlchemy Enum variant that stores the .value string, not .name."""
-
-    def __init__(self, *enums, **kw):
-        # Extract enum class if passed as single arg
-        if len(enums) == 1 and isinstance(enums[0], type) and issubclass(
-            enums[0], _uuid_mod.__class__  # any class
-        ):
-            self._enum_class = enums[0]
-        else:
-            self._enum_class = None
-        # Build a TextEnum-based column instead of a real SA Enum
-        # We'll swap ourselves out with _TextEnum
-        super().__init__(*enums, **kw)
-
-    def _resolve_for_literal(self, value):
-        return value.value if hasattr(value, "value") else value
-
-
-# 2d. Patch the mapper type resolver for uuid.UUID
-try:
-    from sqlalchemy.orm.decl_api import _resolve_type as _orig_resolve
-    def _patched_resolve(python_type, *a, **kw):
-        if python_type is _uuid_mod.UUID:
-            return _UuidStr()
-        return _orig_resolve(python_type, *a, **kw)
-    import sqlalchemy.orm.decl_api as _decl
-    _decl._resolve_type = _patched_resolve
-except Exception:
-    pass
-
-# ─────────────────────────────────────────────────────────────────────────────
-# 3.  NOW import app modules (they will pick up the patched types)
-# ─────────────────────────────────────────────────────────────────────────────
-
-# Force-reload models so the patched pg types are baked into the mapper
-for _mod in list(sys.modules.keys()):
-    if _mod.startswith("app."):
-        del sys.modules[_mod]
-
 from app.database import Base, get_db  # noqa: E402
 import app.models  # noqa: F401
 from app.main import app  # noqa: E402
 
 # ─────────────────────────────────────────────────────────────────────────────
-# 4.  Patch Enum columns on already-compiled mappers
+# 3.  Swap Postgres column types on the mapped tables
 # ─────────────────────────────────────────────────────────────────────────────
-# Even after re-import, SQLAlchemy Enum still uses names not values.
-# Replace every Enum column type on the table metadata with _TextEnum.
-from sqlalchemy import event as _sa_event
-from app.models import CallerStatus, LeadAssignmentStatus
-
-_ENUM_MAP = {
-    "caller_status": CallerStatus,
-    "lead_assignment_status": LeadAssignmentStatus,
-}
-
-for _table in Base.metadata.tables.values():
-    for _col in _table.columns:
-        if isinstance(_col.type, _sa_types.Enum):
-            _enum_name = getattr(_col.type, "name", None)
-            _enum_cls = _ENUM_MAP.get(_enum_name)
-            _col.type = _TextEnum(_enum_cls)
+# Column types are only consulted when statements are compiled/executed, so
+# replacing them on the Table objects after import is enough — no need to
+# patch sqlalchemy modules or re-import the app. The generic Uuid columns
+# already run on SQLite (CHAR(32)) and are left alone.
+from app.models import ENUM_COLUMNS, Caller, Lead, LeadAssignment  # noqa: E402
+
+for _col in ENUM_COLUMNS:
+    _col.type = _TextEnum(_col.type.enum_class)
+Caller.__table__.c.languages.type = _JsonArray()
+Lead.__table__.c.metadata.type = _JsonObject()
 
 # ─────────────────────────────────────────────────────────────────────────────
-# 5.  Create the SQLite test engine + fixtures
+# 4.  Create the SQLite test engine + fixtures
 # ─────────────────────────────────────────────────────────────────────────────
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
-
-_engine = create_engine(
-    "sqlite:///:memory:",
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
-
-Base.metadata.create_all(_engine)
-_Session = sessionmaker(bind=_engine, autocommit=False, autoflush=False)
+import hashlib  # noqa: E402
+import os  # noqa: E402
+import uuid  # noqa: E402
+from pathlib import Path  # noqa: E402
 
 import pytest  # noqa: E402
+import pytest_asyncio  # noqa: E402
 from fastapi.testclient import TestClient  # noqa: E402
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+from sqlalchemy import create_engine, event, insert, select  # noqa: E402
+from sqlalchemy.dialects import sqlite  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+from sqlalchemy.schema import CreateTable  # noqa: E402
+
+from app.services.assignment_engine import (  # noqa: E402
+    _eligible_callers_query,
+    get_business_date,
+    invalidate_state_cache,
+)
+from app.services.caller_names import invalidate_caller_names  # noqa: E402
+
+_DIALECT = sqlite.dialect()
 
+# Matches SessionLocal: objects keep their loaded state across commit().
+# Always bound per test to the class connection.
+_Session = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False)
 
-@pytest.fixture(autouse=True)
-def _clean_db():
-    """Truncate all tables between tests."""
-    with _engine.begin() as conn:
-        for tbl in reversed(Base.metadata.sorted_tables):
-            conn.execute(tbl.delete())
-    yield
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--reuse-db",
+        action="store_true",
+        default=False,
+        help="Keep the SQLite test schema in a file between runs and skip "
+        "create_all while the models are unchanged.",
+    )
+
+
+def _make_engine(url: str):
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+    # pysqlite's implicit BEGIN handling breaks SAVEPOINT; let SQLAlchemy emit
+    # BEGIN itself so nested transactions work (SA "Serializable isolation /
+    # Savepoints / Transactional DDL" recipe).
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_begin(dbapi_conn, _record):
+        dbapi_conn.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    return engine
+
+
+def _schema_fingerprint() -> str:
+    """Hash of the SQLite DDL for every table, i.e. after the type swaps."""
+    ddl = "".join(
+        str(CreateTable(tbl).compile(dialect=_DIALECT)) for tbl in Base.metadata.sorted_tables
+    )
+    return hashlib.sha1(ddl.encode()).hexdigest()
+
+
+@pytest.fixture(scope="session")
+def _engine(request):
+    """
+    In-memory engine with a fresh schema, or with ``--reuse-db`` a file per
+    xdist worker whose schema is only rebuilt when the models change. Tests
+    never commit past their outer transaction, so the file stays empty.
+    """
+    if not request.config.getoption("reuse_db"):
+        engine = _make_engine("sqlite:///:memory:")
+        Base.metadata.create_all(engine)
+        yield engine
+        engine.dispose()
+        return
+
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    path = Path(request.config.rootpath) / f".pytest_db.{worker}.sqlite"
+    fp_path = path.with_suffix(".sha1")
+    fingerprint = _schema_fingerprint()
+    if not (path.exists() and fp_path.exists() and fp_path.read_text() == fingerprint):
+        path.unlink(missing_ok=True)
+        engine = _make_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(engine)
+        fp_path.write_text(fingerprint)
+    else:
+        engine = _make_engine(f"sqlite:///{path}")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _warm_compiled_cache(_engine):
+    """
+    Compile the ORM statement shapes the routers and engine issue once per
+    worker, through a Session, so they share cache keys with the real calls.
+    LIMIT is a bound parameter, so LIMIT 0 warms the LIMIT 1 forms too.
+    """
+    today = get_business_date()
+    missing = uuid.UUID(int=0)
+    with _engine.connect() as conn, _Session(bind=conn) as session:
+        for model in (Caller, Lead, LeadAssignment):
+            session.execute(select(model).limit(0)).all()
+        session.get(Caller, missing)
+        session.get(Lead, missing)
+        for state in (None, "warmup"):
+            session.scalars(
+                _eligible_callers_query(state, today).order_by(Caller.id).limit(0)
+            ).all()
+
+
+@pytest.fixture(scope="class")
+def _class_conn(_engine):
+    """
+    Connection whose outer transaction spans one test class. Class-scoped
+    templates write into it; everything is rolled back after the class.
+    """
+    conn = _engine.connect()
+    trans = conn.begin()
+    try:
+        yield conn
+    finally:
+        trans.rollback()
+        conn.close()
 
 
 @pytest.fixture
-def db():
-    session = _Session()
+def db(_class_conn):
+    """
+    Session inside a SAVEPOINT on the class connection, rolled back after
+    the test. Commits made by the test or the app only release nested
+    SAVEPOINTs, so nothing persists past the test except class templates.
+    """
+    invalidate_state_cache()
+    invalidate_caller_names()
+    nested = _class_conn.begin_nested()
+    session = _Session(bind=_class_conn, join_transaction_mode="create_savepoint")
     try:
         yield session
     finally:
         session.close()
+        nested.rollback()
+
+
+@pytest.fixture(scope="class")
+def alice_template(_class_conn):
+    """
+    Id of "Alice" — active, unlimited, no states — inserted once per class.
+    Use with ``@pytest.mark.usefixtures("alice_template")`` on the class so
+    every test in it sees the same callers.
+    """
+    return _class_conn.execute(
+        insert(Caller)
+        .values(id=uuid.uuid4(), name="Alice", role="Agent", languages=["english"], daily_limit=0)
+        .returning(Caller.id)
+    ).scalar_one()
+
+
+@pytest.fixture
+def alice(db, alice_template):
+    return db.get(Caller, alice_template)
+
+
+@pytest.fixture(scope="session")
+def _client_session():
+    """One TestClient (and one app lifespan) for the whole run."""
+    with TestClient(app) as c:
+        yield c
 
 
 @pytest.fixture
-def client(db):
+def client(_client_session, db):
     def _override():
         yield db
 
     app.dependency_overrides[get_db] = _override
-    with TestClient(app) as c:
-        yield c
-    app.dependency_overrides.clear()
+    try:
+        yield _client_session
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest_asyncio.fixture
+async def aclient(db):
+    """
+    httpx client driving the app in-process on the test's event loop, without
+    TestClient's portal thread. The lifespan is not run, so realtime
+    broadcasts are no-ops; use `client` for WebSocket tests.
+    """
+    def _override():
+        yield db
+
+    app.dependency_overrides[get_db] = _override
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
+            yield c
+    finally:
+        app.dependency_overrides.clear()
@@ -1,17 +1,31 @@
 # In-memory SQLite for tests; covers assignment engine, webhook, callers CRUD, leads.
 # Engine, schema, and db/client fixtures are provided by conftest.py.
+import itertools
 import uuid
 from datetime import datetime, timezone
+from types import MappingProxyType
 from unittest.mock import patch
 
+import pytest
+from sqlalchemy import insert, select
+
 from app.models import Caller, CallerState, CallerStatus, Lead, LeadAssignmentStatus
 
 
 # ── Helpers ──────────────────────────────────────────────────────────────────
 
+# Sequential ids: no os.urandom per row, and callers sort in creation order.
+# Every test rolls back, so the counter never needs resetting.
+_uuid_counter = itertools.count(1)
+
+
+def _fast_uuid():
+    return uuid.UUID(int=next(_uuid_counter))
+
+
 def make_caller(db, name="Alice", daily_limit=5, states=None, status=CallerStatus.ACTIVE):
     c = Caller(
-        id=uuid.uuid4(),
+        id=_fast_uuid(),
         name=name,
         role="Agent",
         languages=["english"],
@@ -22,35 +36,48 @@ def make_caller(db, name="Alice", daily_limit=5, states=None, status=CallerStatu
     for s in (states or []):
         db.add(CallerState(caller_id=c.id, state=s))
     db.commit()
-    db.refresh(c)
     return c
 
 
 def make_lead(db, phone, state=None, timestamp=None):
     lead = Lead(
-        id=uuid.uuid4(),
+        id=_fast_uuid(),
         phone=phone,
         timestamp_from_sheet=timestamp or datetime.now(timezone.utc),
         state=state,
     )
     db.add(lead)
     db.commit()
-    db.refresh(lead)
     return lead
 
 
+def make_leads_bulk(db, phones, state=None):
+    """Insert several leads in one INSERT ... RETURNING; returns them in order."""
+    now = datetime.now(timezone.utc)
+    leads = db.scalars(
+        insert(Lead).returning(Lead, sort_by_parameter_order=True),
+        [
+            {"id": _fast_uuid(), "phone": p, "timestamp_from_sheet": now, "state": state}
+            for p in phones
+        ],
+    ).all()
+    db.commit()
+    return leads
+
+
+_BASE_PAYLOAD = MappingProxyType({
+    "name": "Test Lead",
+    "phone": "9999999999",
+    "timestamp": "2026-02-25T10:00:00Z",
+    "lead_source": "google_sheet",
+    "city": "Mumbai",
+    "state": "maharashtra",
+})
+
+
 def webhook_payload(**overrides):
-    base = {
-        "name": "Test Lead",
-        "phone": "9999999999",
-        "timestamp": "2026-02-25T10:00:00Z",
-        "lead_source": "google_sheet",
-        "city": "Mumbai",
-        "state": "maharashtra",
-        "metadata": {},
-    }
-    base.update(overrides)
-    return base
+    # MappingProxyType is shallow, so nested values are built per call.
+    return {**_BASE_PAYLOAD, "metadata": {}, **overrides}
 
 
 # ── Assignment engine unit tests ─────────────────────────────────────────────
@@ -64,7 +91,7 @@ class TestAssignmentEngine:
         lead  = make_lead(db, phone="1111111111", state="maharashtra")
 
         assignment = assign_lead(db, lead)
-        db.commit()
+        db.flush()
 
         assert str(assignment.caller_id) == str(alice.id)
         assert assignment.assignment_reason == "state_round_robin"
@@ -76,7 +103,7 @@ class TestAssignmentEngine:
         lead  = make_lead(db, phone="2222222222", state="kerala")
 
         assignment = assign_lead(db, lead)
-        db.commit()
+        db.flush()
 
         assert str(assignment.caller_id) == str(alice.id)
         assert assignment.assignment_reason == "global_round_robin"
@@ -88,10 +115,9 @@ class TestAssignmentEngine:
         bob   = make_caller(db, name="Bob",   daily_limit=0)
 
         assigned = []
-        for i in range(4):
-            lead = make_lead(db, phone=f"30000000{i:02d}")
+        for lead in make_leads_bulk(db, [f"30000000{i:02d}" for i in range(4)]):
             a = assign_lead(db, lead)
-            db.commit()
+            db.flush()
             assigned.append(str(a.caller_id))
 
         assert assigned.count(str(alice.id)) == 2
@@ -103,10 +129,9 @@ class TestAssignmentEngine:
         alice = make_caller(db, name="Alice", daily_limit=2)
 
         caller_ids = []
-        for i in range(3):
-            lead = make_lead(db, phone=f"40000000{i:02d}")
+        for lead in make_leads_bulk(db, [f"40000000{i:02d}" for i in range(3)]):
             a = assign_lead(db, lead)
-            db.commit()
+            db.flush()
             caller_ids.append(a.caller_id)
 
         assert caller_ids[0] is not None
@@ -118,19 +143,35 @@ class TestAssignmentEngine:
 
         alice = make_caller(db, name="Alice", daily_limit=0)
 
-        for i in range(10):
-            lead = make_lead(db, phone=f"50000000{i:02d}")
+        for lead in make_leads_bulk(db, [f"50000000{i:02d}" for i in range(10)]):
             a = assign_lead(db, lead)
-            db.commit()
+            db.flush()
             assert a.caller_id is not None
 
+    def test_capped_state_callers_do_not_spill_to_global(self, db):
+        from app.services.assignment_engine import assign_lead
+
+        alice = make_caller(db, name="Alice", daily_limit=1, states=["goa"])
+        make_caller(db, name="Bob", daily_limit=0)
+
+        lead1, lead2 = make_leads_bulk(db, ["6100000001", "6100000002"], state="goa")
+        a1 = assign_lead(db, lead1)
+        db.flush()
+        a2 = assign_lead(db, lead2)
+        db.flush()
+
+        assert str(a1.caller_id) == str(alice.id)
+        assert a1.assignment_reason == "state_round_robin"
+        assert a2.status == LeadAssignmentStatus.UNASSIGNED
+        assert a2.assignment_reason == "unassigned_cap_reached"
+
     def test_paused_caller_excluded(self, db):
         from app.services.assignment_engine import assign_lead
 
         make_caller(db, name="Paused", status="paused")
         lead = make_lead(db, phone="6000000000")
         a = assign_lead(db, lead)
-        db.commit()
+        db.flush()
 
         assert a.status == LeadAssignmentStatus.UNASSIGNED
         assert a.caller_id is None
@@ -140,16 +181,37 @@ class TestAssignmentEngine:
 
         make_caller(db, name="Alice", daily_limit=1)
 
-        lead1 = make_lead(db, phone="7000000001")
+        lead1, lead2 = make_leads_bulk(db, ["7000000001", "7000000002"])
         assign_lead(db, lead1)
-        db.commit()
+        db.flush()
 
-        lead2 = make_lead(db, phone="7000000002")
         a = assign_lead(db, lead2)
-        db.commit()
+        db.flush()
 
         assert a.status == LeadAssignmentStatus.UNASSIGNED
 
+    def test_claim_skips_caller_filled_concurrently(self, db):
+        from app.services import assignment_engine
+        from app.services.assignment_engine import assign_lead
+
+        alice = make_caller(db, name="Alice", daily_limit=1)
+        bob   = make_caller(db, name="Bob",   daily_limit=1)
+        first = assign_lead(db, make_lead(db, phone="7100000001"))
+        db.flush()
+
+        # Simulate a stale eligibility read: the full caller at the front of the
+        # rotation must lose the atomic claim and the next caller gets the lead.
+        everyone = lambda state, day: select(Caller).where(Caller.status == "active")
+        with patch.object(assignment_engine, "_eligible_callers_query", everyone):
+            second = assign_lead(db, make_lead(db, phone="7100000002"))
+            db.flush()
+            third = assign_lead(db, make_lead(db, phone="7100000003"))
+            db.flush()
+
+        assert {str(first.caller_id), str(second.caller_id)} == {str(alice.id), str(bob.id)}
+        assert third.status == LeadAssignmentStatus.UNASSIGNED
+        assert third.assignment_reason == "unassigned_cap_reached"
+
     def test_forced_caller_manual_reassign(self, db):
         from app.services.assignment_engine import assign_lead
 
@@ -159,12 +221,12 @@ class TestAssignmentEngine:
 
         # First assign to alice via normal flow
         a1 = assign_lead(db, lead)
-        db.commit()
+        db.flush()
 
         # Force reassign to bob
         lead2 = make_lead(db, phone="8800000002")
         a2 = assign_lead(db, lead2, forced_caller_id=bob.id)
-        db.commit()
+        db.flush()
 
         assert str(a2.caller_id) == str(bob.id)
         assert a2.assignment_reason == "manual_reassign"
@@ -172,60 +234,142 @@ class TestAssignmentEngine:
 
 # ── Webhook API tests ────────────────────────────────────────────────────────
 
+@pytest.mark.asyncio
 class TestWebhook:
-    def test_webhook_assigns_lead(self, client, db):
+    async def test_webhook_assigns_lead(self, aclient, db):
         make_caller(db, name="Alice", daily_limit=0)
-        res = client.post("/api/leads/webhook", json=webhook_payload())
+        res = await aclient.post("/api/leads/webhook", json=webhook_payload())
         assert res.status_code == 200
         data = res.json()
         assert data["assignment_status"] == "assigned"
         assert data["assigned_caller_id"] is not None
 
-    def test_webhook_idempotent(self, client, db):
+    async def test_webhook_idempotent(self, aclient, db):
         make_caller(db, name="Alice", daily_limit=0)
         payload = webhook_payload()
-        r1 = client.post("/api/leads/webhook", json=payload)
-        r2 = client.post("/api/leads/webhook", json=payload)
+        r1 = await aclient.post("/api/leads/webhook", json=payload)
+        r2 = await aclient.post("/api/leads/webhook", json=payload)
         assert r1.status_code == 200
         assert r2.status_code == 200
         assert r1.json()["id"] == r2.json()["id"]
 
-    def test_webhook_rejects_bad_secret(self, client):
-        with patch.dict("os.environ", {"WEBHOOK_SECRET": "super-secret"}):
-            res = client.post(
-                "/api/leads/webhook",
-                json=webhook_payload(),
-                headers={"X-Webhook-Secret": "wrong"},
-            )
+    async def test_webhook_rejects_bad_secret(self, aclient, monkeypatch):
+        monkeypatch.setenv("WEBHOOK_SECRET", "super-secret")
+        res = await aclient.post(
+            "/api/leads/webhook",
+            json=webhook_payload(),
+            headers={"X-Webhook-Secret": "wrong"},
+        )
         assert res.status_code == 401
 
-    def test_webhook_accepts_correct_secret(self, client, db):
+    async def test_webhook_accepts_correct_secret(self, aclient, db, monkeypatch):
+        monkeypatch.setenv("WEBHOOK_SECRET", "super-secret")
         make_caller(db, name="Alice", daily_limit=0)
-        with patch.dict("os.environ", {"WEBHOOK_SECRET": "super-secret"}):
-            res = client.post(
-                "/api/leads/webhook",
-                json=webhook_payload(phone="8888888888"),
-                headers={"X-Webhook-Secret": "super-secret"},
-            )
+        res = await aclient.post(
+            "/api/leads/webhook",
+            json=webhook_payload(phone="8888888888"),
+            headers={"X-Webhook-Secret": "super-secret"},
+        )
         assert res.status_code == 200
 
-    def test_webhook_unassigned_when_no_callers(self, client):
-        res = client.post("/api/leads/webhook", json=webhook_payload())
+    async def test_webhook_unassigned_when_no_callers(self, aclient):
+        res = await aclient.post("/api/leads/webhook", json=webhook_payload())
         assert res.status_code == 200
         assert res.json()["assignment_status"] == "unassigned"
 
-    def test_webhook_missing_required_fields(self, client):
-        res = client.post("/api/leads/webhook", json={"name": "No phone"})
+    async def test_webhook_missing_required_fields(self, aclient):
+        res = await aclient.post("/api/leads/webhook", json={"name": "No phone"})
         assert res.status_code == 422
 
-    def test_webhook_metadata_optional(self, client, db):
+    async def test_webhook_batch_skips_duplicates(self, aclient, db):
+        make_caller(db, name="Alice", daily_limit=0)
+        await aclient.post("/api/leads/webhook", json=webhook_payload(phone="1231231230"))
+        res = await aclient.post("/api/leads/webhook/batch", json=[
+            webhook_payload(phone="1231231230"),
+            webhook_payload(phone="1231231231", metadata={"row": 2}),
+            webhook_payload(phone="1231231232"),
+        ])
+        assert res.status_code == 200
+        data = res.json()
+        assert sorted(d["phone"] for d in data) == ["1231231231", "1231231232"]
+        assert all(d["assignment_status"] == "assigned" for d in data)
+
+    async def test_webhook_batch_assigns_in_chunks(self, aclient, db, monkeypatch):
+        from app.routers import webhook
+
+        monkeypatch.setattr(webhook, "BATCH_ASSIGN_CHUNK_SIZE", 2)
+        alice = make_caller(db, name="Alice", daily_limit=0)
+        bob = make_caller(db, name="Bob", daily_limit=0)
+        res = await aclient.post("/api/leads/webhook/batch", json=[
+            webhook_payload(phone=f"124000000{i}") for i in range(5)
+        ])
+        assert res.status_code == 200
+        ids = [d["assigned_caller_id"] for d in res.json()]
+        assert sorted(ids) == sorted([str(alice.id)] * 3 + [str(bob.id)] * 2)
+
+    async def test_webhook_batch_rejects_oversized(self, aclient, monkeypatch):
+        from app.routers import webhook
+
+        monkeypatch.setattr(webhook, "BATCH_MAX_ROWS", 2)
+        res = await aclient.post("/api/leads/webhook/batch", json=[
+            webhook_payload(phone=f"125000000{i}") for i in range(3)
+        ])
+        assert res.status_code == 413
+
+    async def test_webhook_metadata_optional(self, aclient, db):
         make_caller(db, name="Alice", daily_limit=0)
         payload = webhook_payload()
         del payload["metadata"]
-        res = client.post("/api/leads/webhook", json=payload)
+        res = await aclient.post("/api/leads/webhook", json=payload)
         assert res.status_code == 200
 
 
+@pytest.mark.postgres
+class TestLeadIngestCopy:
+    """COPY ingest path; needs TEST_POSTGRES_URL pointing at a migrated database."""
+
+    def test_copy_ingest_preserves_values(self, monkeypatch):
+        import os
+
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import Session
+
+        from app.schemas import LeadWebhookIn
+        from app.services import lead_ingest
+
+        url = os.getenv("TEST_POSTGRES_URL")
+        if not url:
+            pytest.skip("TEST_POSTGRES_URL not set")
+        monkeypatch.setattr(lead_ingest, "COPY_THRESHOLD", 0)
+
+        payloads = [
+            LeadWebhookIn(
+                name=r"\N", phone="1700000001", timestamp="2026-03-01T10:00:00Z",
+                city='Say "hi", ok', metadata={"row": 1},
+            ),
+            LeadWebhookIn(name="", phone="1700000002", timestamp="2026-03-01T10:01:00Z"),
+        ]
+        engine = create_engine(url)
+        with engine.connect() as conn:
+            trans = conn.begin()
+            db = Session(bind=conn, join_transaction_mode="create_savepoint")
+            try:
+                rows = [lead_ingest.lead_row(p) for p in payloads]
+                leads = sorted(lead_ingest.ingest_leads(db, rows), key=lambda lead: lead.phone)
+                again = lead_ingest.ingest_leads(db, [lead_ingest.lead_row(p) for p in payloads])
+            finally:
+                db.close()
+                trans.rollback()
+        engine.dispose()
+
+        assert [lead.name for lead in leads] == [r"\N", ""]
+        assert leads[0].city == 'Say "hi", ok'
+        assert leads[0].lead_metadata == {"row": 1}
+        assert leads[1].city is None
+        assert leads[1].lead_metadata is None
+        assert again == []
+
+
 # ── Caller CRUD tests ────────────────────────────────────────────────────────
 
 class TestCallers:
@@ -262,6 +406,35 @@ class TestCallers:
         assert data["daily_limit"] == 20
         assert "goa" in data["assigned_states"]
 
+    def test_update_caller_replaces_states(self, client, db):
+        c = make_caller(db, name="Dana", daily_limit=5, states=["goa", "kerala"])
+        res = client.put(f"/api/callers/{c.id}", json={
+            "assigned_states": ["kerala", "delhi"],
+        })
+        assert res.status_code == 200
+        assert sorted(res.json()["assigned_states"]) == ["delhi", "kerala"]
+
+    def test_update_caller_states_affects_next_assignment(self, client, db):
+        make_caller(db, name="Alice", daily_limit=0)
+        bob = make_caller(db, name="Bob", daily_limit=0)
+        r1 = client.post("/api/leads/webhook", json=webhook_payload(phone="1400000001", state="goa"))
+        assert r1.json()["assignment_reason"] == "global_round_robin"
+
+        client.put(f"/api/callers/{bob.id}", json={"assigned_states": ["goa"]})
+        r2 = client.post("/api/leads/webhook", json=webhook_payload(phone="1400000002", state="goa"))
+        assert r2.json()["assignment_reason"] == "state_round_robin"
+        assert r2.json()["assigned_caller_id"] == str(bob.id)
+
+    def test_pausing_state_caller_affects_next_assignment(self, client, db):
+        alice = make_caller(db, name="Alice", daily_limit=0, states=["goa"])
+        bob = make_caller(db, name="Bob", daily_limit=0)
+        r1 = client.post("/api/leads/webhook", json=webhook_payload(phone="1410000001", state="goa"))
+        assert r1.json()["assigned_caller_id"] == str(alice.id)
+
+        client.patch(f"/api/callers/{alice.id}/status", json={"status": "paused"})
+        r2 = client.post("/api/leads/webhook", json=webhook_payload(phone="1410000002", state="goa"))
+        assert r2.json()["assigned_caller_id"] == str(bob.id)
+
     def test_patch_caller_status(self, client, db):
         c = make_caller(db, name="Eve", daily_limit=0)
         res = client.patch(f"/api/callers/{c.id}/status", json={"status": "paused"})
@@ -295,6 +468,20 @@ class TestCallers:
         res = client.put(f"/api/callers/{uuid.uuid4()}", json={"daily_limit": 5})
         assert res.status_code == 404
 
+    def test_update_caller_reports_leads_assigned_today(self, client, db):
+        c = make_caller(db, name="Heidi", daily_limit=0)
+        client.post("/api/leads/webhook", json=webhook_payload())
+        res = client.patch(f"/api/callers/{c.id}/status", json={"status": "paused"})
+        assert res.json()["leads_assigned_today"] == 1
+
+    def test_list_callers_gzipped(self, client, db):
+        for i in range(10):
+            make_caller(db, name=f"Caller {i}", daily_limit=0, states=["maharashtra"])
+        res = client.get("/api/callers", headers={"Accept-Encoding": "gzip"})
+        assert res.status_code == 200
+        assert res.headers["content-encoding"] == "gzip"
+        assert len(res.json()) == 10
+
     def test_caller_leads_assigned_today(self, client, db):
         make_caller(db, name="Grace", daily_limit=0)
         client.post("/api/leads/webhook", json=webhook_payload())
@@ -305,6 +492,7 @@ class TestCallers:
 
 # ── Lead list & reassign tests ───────────────────────────────────────────────
 
+@pytest.mark.usefixtures("alice_template")
 class TestLeads:
     def test_list_leads_empty(self, client):
         res = client.get("/api/leads")
@@ -312,14 +500,13 @@ class TestLeads:
         assert res.json() == []
 
     def test_list_leads_after_webhook(self, client, db):
-        make_caller(db, name="Grace", daily_limit=0)
         client.post("/api/leads/webhook", json=webhook_payload())
         res = client.get("/api/leads")
         assert res.status_code == 200
         assert len(res.json()) == 1
+        assert res.json()[0]["assigned_caller_name"] == "Alice"
 
     def test_filter_leads_by_state(self, client, db):
-        make_caller(db, name="Grace", daily_limit=0)
         client.post("/api/leads/webhook", json=webhook_payload(state="maharashtra"))
         client.post("/api/leads/webhook", json=webhook_payload(
             phone="1112223333", state="karnataka", timestamp="2026-02-25T11:00:00Z"
@@ -330,8 +517,52 @@ class TestLeads:
         assert len(leads) == 1
         assert leads[0]["state"] == "maharashtra"
 
-    def test_filter_leads_by_caller(self, client, db):
-        alice = make_caller(db, name="Alice", daily_limit=0)
+    def test_list_leads_include_total(self, client, db):
+        for i in range(3):
+            client.post("/api/leads/webhook", json=webhook_payload(phone=f"150000000{i}"))
+        res = client.get("/api/leads?limit=2&include_total=true")
+        assert len(res.json()) == 2
+        assert res.headers["X-Total-Count"] == "3"
+        assert "X-Total-Count" not in client.get("/api/leads").headers
+
+    def test_list_leads_keyset_pagination(self, client, db):
+        # Explicit created_at values (SQLite timestamps are per-second); two share one to
+        # exercise the id tie-breaker.
+        stamps = [datetime(2026, 3, 1, 10, m) for m in (0, 1, 1, 2, 3)]
+        for i, ts in enumerate(stamps):
+            db.add(Lead(
+                id=_fast_uuid(), phone=f"16000000{i:02d}",
+                timestamp_from_sheet=ts, created_at=ts,
+            ))
+        db.commit()
+
+        seen = []
+        url = "/api/leads?limit=2"
+        while True:
+            res = client.get(url)
+            seen += [lead["id"] for lead in res.json()]
+            if "X-Next-Cursor" not in res.headers:
+                break
+            url = f"/api/leads?limit=2&{res.headers['X-Next-Cursor']}"
+
+        expected = [lead["id"] for lead in client.get("/api/leads?limit=10").json()]
+        assert seen == expected
+        assert len(seen) == 5
+
+    def test_list_leads_limit_zero(self, client, db):
+        client.post("/api/leads/webhook", json=webhook_payload())
+        res = client.get("/api/leads?limit=0")
+        assert res.status_code == 200
+        assert res.json() == []
+        assert "X-Next-Cursor" not in res.headers
+
+    def test_list_leads_rejects_half_cursor(self, client):
+        res = client.get("/api/leads?cursor_ts=2026-03-01T10:00:00")
+        assert res.status_code == 422
+        res = client.get(f"/api/leads?cursor_id={uuid.uuid4()}")
+        assert res.status_code == 422
+
+    def test_filter_leads_by_caller(self, client, db, alice):
         bob   = make_caller(db, name="Bob",   daily_limit=0)
         client.post("/api/leads/webhook", json=webhook_payload(phone="1000000001"))
         client.post("/api/leads/webhook", json=webhook_payload(phone="1000000002", timestamp="2026-02-25T12:00:00Z"))
@@ -341,14 +572,12 @@ class TestLeads:
         assert len(res.json()) >= 1
 
     def test_search_leads_by_phone(self, client, db):
-        make_caller(db, name="Grace", daily_limit=0)
         client.post("/api/leads/webhook", json=webhook_payload(phone="5551234567"))
         res = client.get("/api/leads?search=5551234567")
         assert res.status_code == 200
         assert len(res.json()) == 1
 
     def test_get_lead_detail(self, client, db):
-        make_caller(db, name="Grace", daily_limit=0)
         r = client.post("/api/leads/webhook", json=webhook_payload())
         lead_id = r.json()["id"]
         res = client.get(f"/api/leads/{lead_id}")
@@ -360,7 +589,6 @@ class TestLeads:
         assert res.status_code == 404
 
     def test_reassign_lead(self, client, db):
-        alice = make_caller(db, name="Alice", daily_limit=0)
         bob   = make_caller(db, name="Bob",   daily_limit=0)
 
         r = client.post("/api/leads/webhook", json=webhook_payload())
@@ -371,17 +599,96 @@ class TestLeads:
         assert str(res.json()["assigned_caller_id"]) == str(bob.id)
         assert res.json()["assignment_reason"] == "manual_reassign"
 
-    def test_reassign_nonexistent_lead(self, client, db):
-        c = make_caller(db, name="Alice", daily_limit=0)
-        res = client.patch(f"/api/leads/{uuid.uuid4()}/reassign", json={"caller_id": str(c.id)})
+    def test_reassign_nonexistent_lead(self, client, alice):
+        res = client.patch(f"/api/leads/{uuid.uuid4()}/reassign", json={"caller_id": str(alice.id)})
         assert res.status_code == 404
 
     def test_reassign_to_auto(self, client, db):
         """Passing caller_id=null triggers auto round-robin reassign."""
-        make_caller(db, name="Alice", daily_limit=0)
         r = client.post("/api/leads/webhook", json=webhook_payload())
         lead_id = r.json()["id"]
 
         res = client.patch(f"/api/leads/{lead_id}/reassign", json={"caller_id": None})
         assert res.status_code == 200
 
+
+
+# ── Realtime dashboard tests ─────────────────────────────────────────────────
+
+class TestRealtime:
+    def test_dashboard_receives_assignment(self, client, db):
+        make_caller(db, name="Alice", daily_limit=0)
+        with client.websocket_connect("/ws/dashboard") as ws:
+            r = client.post("/api/leads/webhook", json=webhook_payload())
+            msg = ws.receive_json()
+        assert msg["type"] == "assignment"
+        assert msg["payload"]["lead_id"] == r.json()["id"]
+        assert msg["payload"]["assignment_status"] == "assigned"
+
+    def test_broadcast_drops_failed_sockets(self):
+        import asyncio
+
+        from app.services.realtime import AssignmentEventOut, ConnectionManager
+
+        class _Socket:
+            def __init__(self, fail=False):
+                self.fail = fail
+                self.sent = []
+
+            async def send_text(self, text):
+                if self.fail:
+                    raise RuntimeError("gone")
+                self.sent.append(text)
+
+        manager = ConnectionManager()
+        good, bad = _Socket(), _Socket(fail=True)
+        manager.active_connections.update([good, bad])
+        event = AssignmentEventOut(
+            lead_id="l1",
+            caller_id=None,
+            assignment_status=LeadAssignmentStatus.UNASSIGNED,
+            assignment_reason="unassigned_cap_reached",
+            timestamp=datetime.now(timezone.utc),
+        )
+        asyncio.run(manager._fan_out(event))
+
+        assert len(good.sent) == 1
+        assert manager.active_connections == {good}
+
+    def test_consumer_survives_fan_out_error(self):
+        import asyncio
+
+        from app.services.realtime import AssignmentEventOut, ConnectionManager
+
+        manager = ConnectionManager()
+        delivered = []
+
+        async def fan_out(event):
+            if event.lead_id == "bad":
+                raise ValueError("boom")
+            delivered.append(event.lead_id)
+
+        manager._fan_out = fan_out
+
+        def event(lead_id):
+            return AssignmentEventOut(
+                lead_id=lead_id,
+                caller_id=None,
+                assignment_status=LeadAssignmentStatus.UNASSIGNED,
+                assignment_reason="unassigned_cap_reached",
+                timestamp=datetime.now(timezone.utc),
+            )
+
+        async def run():
+            queue = asyncio.Queue()
+            consumer = asyncio.create_task(manager._consume(queue))
+            queue.put_nowait(event("bad"))
+            queue.put_nowait(event("good"))
+            for _ in range(100):
+                if delivered:
+                    break
+                await asyncio.sleep(0)
+            consumer.cancel()
+
+        asyncio.run(run())
+        assert delivered == ["good"]